@@ -8,16 +8,14 @@
 import itertools
 import numpy as np
 import ccdproc as ccdp
-from astropy import units
 from astropy.io import fits
 import scipy.optimize as so
 import matplotlib.pyplot as plt
 from astropy.table import Table
-from astropy.nddata import CCDData
-from scipy.signal import find_peaks
 from skimage.morphology import disk
 from skimage import filters, feature
-from scipy.ndimage import gaussian_filter
+from scipy.ndimage import gaussian_filter, binary_dilation
+from scipy.signal import find_peaks
 
 from .background import fitbg3
 from .niriss_profiles import *
@@ -111,9 +109,11 @@ def image_filtering(img, radius=1, gf=4):
        A mask for the image that isolates where the spectral 
        orders are.
     """
-    mask = filters.rank.maximum(img/np.nanmax(img),
-                                disk(radius=radius))
-    mask = np.array(mask, dtype=bool)
+    # masks everything within the disk of any pixel that is nonzero
+    # once the image is scaled to 8 bits (rank.maximum's uint8 path),
+    # without building the local histograms of the rank filter
+    bright = img/np.nanmax(img)*255 > 0.5
+    mask = binary_dilation(bright, structure=disk(radius=radius))
 
     # applies the mask to the main frame
     data = img*~mask
@@ -128,6 +128,143 @@ def image_filtering(img, radius=1, gf=4):
 
     return z, g
 
+
+def _rm_outliers(arr):
+    """
+    Removes instantaneous outliers by setting them to 0. A point is
+    an outlier when its difference to the next point is larger than
+    the mean plus three times the standard deviation of all the
+    differences.
+
+    Parameters
+    ----------
+    arr : np.ndarray
+       1D array to clean. This array is modified in place.
+
+    Returns
+    -------
+    arr : np.ndarray
+       The cleaned array.
+    """
+    d = np.diff(arr)
+    arr[:-1][np.abs(d) >= d.mean() + 3*d.std()] = 0
+    return arr
+
+
+def _column_centers(mask, row0=0):
+    """
+    Finds the mean row index of the masked pixels in each column.
+
+    Parameters
+    ----------
+    mask : np.ndarray
+       2D boolean array.
+    row0 : int; optional
+       The image row of the first row in `mask`. Default is 0.
+
+    Returns
+    -------
+    centers : np.ndarray
+       The (integer) center of each column. Columns without any
+       masked pixels are set to 0.
+    """
+    mask = mask.astype(float)
+    count = mask.sum(axis=0)
+    rows = np.arange(row0, row0+mask.shape[0], dtype=float)
+
+    centers = np.zeros(mask.shape[1], dtype=int)
+    good = count > 0
+    centers[good] = (rows @ mask)[good]/count[good]
+    return centers
+
+
+def _fit_polynomials(points, xeval, deg=4):
+    """
+    Fits a polynomial to each set of points and evaluates all of
+    them on a shared grid.
+
+    Parameters
+    ----------
+    points : list
+       The (x, y) arrays of the points for each fit.
+    xeval : np.ndarray
+       The x-values at which to evaluate the fitted polynomials.
+    deg : int; optional
+       The degree of the polynomials. Default is 4.
+
+    Returns
+    -------
+    fits : np.ndarray
+       The fitted polynomials evaluated at `xeval`, with shape
+       (len(xeval), len(points)).
+    """
+    coeffs = np.empty((deg+1, len(points)))
+    for i, (x, y) in enumerate(points):
+        coeffs[:, i] = np.polynomial.polynomial.polyfit(x, y, deg)
+
+    # evaluates all of the fits with a single Vandermonde matrix
+    return np.polynomial.polynomial.polyvander(xeval, deg) @ coeffs
+
+
+def _column_peaks(img, heights, floors, distance, npeaks):
+    """
+    Finds the peaks in each column of an image.
+
+    Parameters
+    ----------
+    img : np.ndarray
+       2D image array.
+    heights : np.ndarray
+       The minimum height of a peak in each column.
+    floors : np.ndarray
+       Peaks at or below this row are ignored in each column.
+    distance : int
+       The minimum number of rows between neighbouring peaks.
+    npeaks : int
+       The maximum number of peaks per column.
+
+    Returns
+    -------
+    peaks : np.ndarray
+       The row of each peak in each column, with shape
+       (img.shape[1], npeaks). Unused entries are set to 0.
+    """
+    peaks = np.zeros((img.shape[1], npeaks))
+    for i in range(img.shape[1]):
+        p,_ = find_peaks(img[:,i], height=heights[i], distance=distance)
+        p = p[p > floors[i]]
+        peaks[i,:len(p)] = p
+    return peaks
+
+
+def _double_peaks(img, height, distance):
+    """
+    Finds the columns of an image which have exactly two peaks.
+
+    Parameters
+    ----------
+    img : np.ndarray
+       2D image array.
+    height : float
+       The minimum height of a peak.
+    distance : int
+       The minimum number of rows between neighbouring peaks.
+
+    Returns
+    -------
+    peaks : np.ndarray
+       The rows of the two peaks in each column, with shape
+       (img.shape[1], 2). Columns without exactly two peaks are
+       set to 0.
+    """
+    peaks = np.zeros((img.shape[1], 2))
+    for i in range(img.shape[1]):
+        p,_ = find_peaks(img[:,i], height=height, distance=distance)
+        if len(p) == 2:
+            peaks[i] = p
+    return peaks
+
+
 def f277_mask(data, isplots=0):
     """        
     Marks the overlap region in the f277w filter image.
@@ -149,14 +286,22 @@ def f277_mask(data, isplots=0):
     """
     img = np.nanmax(data.f277, axis=(0,1))
     mask, _ = image_filtering(img[:150,:500])
-    mid = np.zeros((mask.shape[1], 2),dtype=int)
+    ny, nx = mask.shape
+
+    # Finds the second and second-to-last edge in each column
+    cumulative = np.cumsum(mask, axis=0)
+    count = cumulative[-1]
+    good = count > 1
+    lower = np.argmax(cumulative == 2, axis=0)
+    upper = np.argmax(cumulative == count-1, axis=0)
+
+    rows = np.arange(ny)[:,None]
     new_mask = np.zeros(img.shape)
-    
-    for i in range(mask.shape[1]):
-        inds = np.where(mask[:,i]==True)[0]
-        if len(inds) > 1:
-            new_mask[inds[1]:inds[-2], i] = True
-            mid[i] = np.array([i, (inds[1]+inds[-2])/2])
+    new_mask[:ny,:nx] = (rows >= lower) & (rows < upper) & good
+
+    mid = np.zeros((nx, 2), dtype=int)
+    mid[good,0] = np.arange(nx)[good]
+    mid[good,1] = (lower[good]+upper[good])//2
 
     q = ((mid[:,0]<420) & (mid[:,1]>0) & (mid[:,0] > 0))
 
@@ -195,37 +340,21 @@ def mask_method_one(data, meta, isplots=0, save=True):
     -------
     meta : object
     """
-    def rm_outliers(arr):
-        # removes instantaneous outliers
-        diff = np.diff(arr)
-        outliers = np.where(np.abs(diff)>=np.nanmean(diff)+3*np.nanstd(diff))
-        arr[outliers] = 0
-        return arr
-    
     def find_centers(img, cutends):
         """ Finds a running center """
-        centers = np.zeros(len(img[0]), dtype=int)
-        for i in range(len(img[0])):
-            inds = np.where(img[:,i]>0)[0]
-            if len(inds)>0:
-                centers[i] = np.nanmean(inds)
-
-        centers = rm_outliers(centers)
+        centers = _rm_outliers(_column_centers(img > 0))
 
         if cutends is not None:
             centers[cutends:] = 0
 
         return centers
     
-    def clean_and_fit(x1,x2,y1,y2):
-        x1,y1 = x1[y1>0], y1[y1>0]
-        x2,y2 = x2[y2>0], y2[y2>0]
-        
-        poly = np.polyfit(np.append(x1,x2),
-                          np.append(y1,y2),
-                          deg=4) # hard coded deg of polynomial fit
-        fit = np.poly1d(poly)
-        return fit
+    def clean(x1,x2,y1,y2):
+        """ Joins the good points of both sets """
+        good1, good2 = y1>0, y2>0
+        x = np.concatenate((np.compress(good1, x1), np.compress(good2, x2)))
+        y = np.concatenate((np.compress(good1, y1), np.compress(good2, y2)))
+        return x, y
 
     g = simplify_niriss_img(data, meta, isplots)
 
@@ -234,33 +363,28 @@ def mask_method_one(data, meta, isplots=0, save=True):
     g_centers = find_centers(g,cutends=None)
     f_centers = find_centers(f,cutends=430) # hard coded end of the F277 img
 
-    gcenters_1 = np.zeros(len(g[0]),dtype=int)
-    gcenters_2 = np.zeros(len(g[0]),dtype=int)
-
-    for i in range(len(g[0])):
-        inds = np.where(g[:,i]>100)[0]
-        inds_1 = inds[inds <= 78] # hard coded y-boundary for the first order
-        inds_2 = inds[inds>=80]   # hard coded y-boundary for the second order
-        if len(inds_1)>=1:
-            gcenters_1[i] = np.nanmean(inds_1)
-        if len(inds_2)>=1:
-            gcenters_2[i] = np.nanmean(inds_2)
+    # hard coded y-boundaries for the first and second orders
+    bright = g > 100
+    gcenters_1 = _column_centers(bright[:79])
+    gcenters_2 = _column_centers(bright[80:], row0=80)
 
-    gcenters_1 = rm_outliers(gcenters_1)
-    gcenters_2 = rm_outliers(gcenters_2)
+    gcenters_1 = _rm_outliers(gcenters_1)
+    gcenters_2 = _rm_outliers(gcenters_2)
     x = np.arange(0,len(gcenters_1),1)
 
-    fit1 = clean_and_fit(x, x[x>800],
-                         f_centers, gcenters_1[x>800])
-    fit2 = clean_and_fit(x, x[(x>800) & (x<1800)],
-                         f_centers, gcenters_2[(x>800) & (x<1800)])
+    points = [clean(x, x[x>800],
+                    f_centers, gcenters_1[x>800]),
+              clean(x, x[(x>800) & (x<1800)],
+                    f_centers, gcenters_2[(x>800) & (x<1800)])]
+    # hard coded deg of polynomial fit
+    fit1, fit2 = _fit_polynomials(points, x, deg=4).T
     
     if isplots >= 5:
         plt.figure(figsize=(14,4))
         plt.title('Order Approximation')
         plt.imshow(g+f)
-        plt.plot(x, fit1(x), 'k', label='First Order')
-        plt.plot(x, fit2(x), 'r', label='Second Order')
+        plt.plot(x, fit1, 'k', label='First Order')
+        plt.plot(x, fit2, 'r', label='Second Order')
         plt.xlabel('x')
         plt.ylabel('y')
         plt.legend(bbox_to_anchor=(1.05, 1), loc=2, borderaxespad=0.)
@@ -268,8 +392,8 @@ def mask_method_one(data, meta, isplots=0, save=True):
 
     tab = Table()
     tab['x'] = x
-    tab['order_1'] = fit1(x)
-    tab['order_2'] = fit2(x)
+    tab['order_1'] = fit1
+    tab['order_2'] = fit2
 
     if save:
         tab.write('niriss_order_fits_method1.csv',format='csv')
@@ -303,43 +427,29 @@ def mask_method_two(data, meta, isplots=0, save=False):
     -------
     meta : object
     """
-    def identify_peaks(column, height, distance):
-        p,_ = find_peaks(column, height=height, distance=distance)
-        return p
-
-
     summed = np.nansum(data.data, axis=0)
-    ccd = CCDData(summed*units.electron)
 
-    new_ccd_no_premask = ccdp.cosmicray_lacosmic(ccd, readnoise=150,
-                                                 sigclip=5, verbose=False)
+    # Passing the bare array (in electrons, so gain=1) skips the CCDData
+    # copies; the cleaned array is returned along with the cosmic ray mask
+    new_ccd_no_premask, _ = ccdp.cosmicray_lacosmic(summed, readnoise=150,
+                                                    sigclip=5, gain=1.0,
+                                                    verbose=False)
     
     summed_f277 = np.nansum(data.f277, axis=(0,1))
 
-    f277_peaks = np.zeros((summed_f277.shape[1],2))
-    peaks = np.zeros((new_ccd_no_premask.shape[1], 6))
     double_peaked = [500, 700, 1850] # hard coded numbers to help set height bounds
-    
 
-    for i in range(summed.shape[1]):
+    # Identifies peaks in the F277W filtered image
+    f277_peaks = _double_peaks(summed_f277, 100000., 10)
 
-        # Identifies peaks in the F277W filtered image
-        fp = identify_peaks(summed_f277[:,i], height=100000, distance=10)
-        if len(fp)==2:
-            f277_peaks[i] = fp
-    
-        if i < double_peaked[0]:
-            height=2000
-        elif i >= double_peaked[0] and i < double_peaked[1]:
-            height = 100
-        elif i >= double_peaked[1]:
-            height = 5000
-            
-        p = identify_peaks(new_ccd_no_premask[:,i].data, height=height, distance=10)
-        if i < 900:
-            p = p[p>40] # sometimes catches an upper edge that doesn't exist
-        
-        peaks[i][:len(p)] = p
+    # Identifies peaks in each column of the cleaned image
+    cols = np.arange(summed.shape[1])
+    heights = np.where(cols < double_peaked[0], 2000.,
+                       np.where(cols < double_peaked[1], 100., 5000.))
+    # sometimes catches an upper edge that doesn't exist
+    floors = np.where(cols < 900, 40, -1)
+    peaks = _column_peaks(new_ccd_no_premask, heights, floors,
+                          10, 6)
 
     # Removes 0s from the F277W boundaries
     xf = np.arange(0,summed_f277.shape[1],1)
@@ -351,6 +461,7 @@ def mask_method_two(data, meta, isplots=0, save=False):
     x = np.arange(0,new_ccd_no_premask.shape[1],1)
     avg = np.zeros((new_ccd_no_premask.shape[1], 6))
 
+    points = []
     for ind in range(4): # CHANGE THIS TO 6 TO ADD THE THIRD ORDER
         q = peaks[:,ind] > 0
         
@@ -373,11 +484,10 @@ def mask_method_two(data, meta, isplots=0, save=False):
         else:
             ytot = np.append(f277_peaks[:,1][:cutoff], y)
         
-        # Fits a 4th degree polynomiall
-        poly= np.polyfit(xtot, ytot, deg=4)
-        fit = np.poly1d(poly)
-            
-        avg[:,ind] = fit(x)
+        points.append((xtot, ytot))
+
+    # Fits a 4th degree polynomiall to each boundary
+    avg[:,:len(points)] = _fit_polynomials(points, x, deg=4)
 
     if isplots >= 5:
         plt.figure(figsize=(14,4))
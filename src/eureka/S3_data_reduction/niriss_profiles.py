@@ -6,11 +6,11 @@ the optimal extraction of the data.
 
 import numpy as np
 from scipy.special import gamma
-from astropy.modeling.models import Gaussian1D, Moffat1D
+from astropy.modeling.models import Gaussian1D
 
 __all__ = ['moffat_2poly_piecewise', 'moffat_1poly_piecewise',
            'gaussian_1poly_piecewise', 'gaussian_2poly_piecewise',
-           'generalized_normal']
+           'generalized_normal', 'moffat']
 
 
 def generalized_normal(x, mu,alpha,beta,scale):
@@ -40,6 +40,30 @@ def generalized_normal(x, mu,alpha,beta,scale):
     return frac * np.exp(-exp)*scale
 
 
+def moffat(x, mu, alpha, width, amplitude):
+    """
+    Moffat profile. This is the same as evaluating
+    `astropy.modeling.models.Moffat1D`, without the
+    overhead of building an astropy model.
+
+    Parameters
+    ----------
+    x : np.ndarray
+       X values to evaluate the profile over.
+    mu : float
+       Center value of the profile.
+    alpha : float
+       Sets the power-law wings of the profile.
+    width : float
+       Sets the core width of the profile (gamma in
+       astropy).
+    amplitude : float
+       The peak value of the profile.
+    """
+    z = (x-mu)/width
+    return amplitude * (1.0 + z*z)**(-alpha)
+
+
 def moffat_2poly_piecewise(args, x):
     """
     A piece-wise function consisting of 2 Moffat profiles
@@ -56,12 +80,9 @@ def moffat_2poly_piecewise(args, x):
     x0,x1,mu1,alpha1,gamma1,f1,a,b,c,mu2,alpha2,gamma2,f2 = args
     model = np.piecewise(x, [((x<x0)), 
                              ((x>=x0) & (x<x1))],
-                         [lambda x: Moffat1D(x, x_0=mu1, alpha=alpha1, 
-                                             gamma=gamma1, amplitude=f1),
+                         [lambda x: moffat(x, mu1, alpha1, gamma1, f1),
                           lambda x: a*x**2+b*x+c,
-                          lambda x: Moffat1D(x, x_0=mu2, alpha=alpha2, 
-                                             gamma=gamma2, 
-                                             amplitude=f2)]
+                          lambda x: moffat(x, mu2, alpha2, gamma2, f2)]
                         )
     return model
 
@@ -82,12 +103,9 @@ def moffat_1poly_piecewise(args, x):
     x0,x1,mu1,alpha1,gamma1,f1,m,b,mu2,alpha2,gamma2,f2 = args
     model = np.piecewise(x, [((x<x0)), 
                              ((x>=x0) & (x<x1))],
-                         [lambda x: Moffat1D(x, x_0=mu1, alpha=alpha1,
-                                             gamma=gamma1, amplitude=f1),
+                         [lambda x: moffat(x, mu1, alpha1, gamma1, f1),
                           lambda x: m*x+b,
-                          lambda x: Moffat1D(x, x_0=mu2, alpha=alpha2,
-                                             gamma=gamma2,
-                                             amplitude=f2)]
+                          lambda x: moffat(x, mu2, alpha2, gamma2, f2)]
                         )
     return model
 
@@ -623,6 +623,10 @@ def difference_frames(data, meta, log):
 
     diffmask = np.zeros((meta.nreads, meta.ny, meta.nx))
     guess = np.zeros((meta.nreads), dtype=int)
+    # The subarray region is the same for every read
+    y0 = meta.ywindow[0]
+    ysl = slice(y0, meta.ywindow[1])
+    xsl = slice(meta.xwindow[0], meta.xwindow[1])
     for n in range(meta.nreads):
         diffmask[n] = data['flatmask'][0][0]
         if meta.nreads > 1:
@@ -633,12 +637,9 @@ def difference_frames(data, meta, log):
             pass
 
         # Guess spectrum position only using subarray region
-        masked_data = diffflux[n, meta.ywindow[0]:meta.ywindow[1],
-                               meta.xwindow[0]:meta.xwindow[1]] * \
-            diffmask[n, meta.ywindow[0]:meta.ywindow[1],
-                     meta.xwindow[0]:meta.xwindow[1]]
+        masked_data = diffflux[n, ysl, xsl] * diffmask[n, ysl, xsl]
         guess[n] = (np.median(np.where(masked_data > np.mean(masked_data))[0]) 
-                    + meta.ywindow[0]).astype(int)
+                    + y0).astype(int)
     # Guess may be skewed if first read is zeros
     if guess[0] < 0 or guess[0] > meta.ny:
         guess[0] = guess[1]
@@ -126,6 +126,9 @@ def fitlc(eventlabel, ecf_path=None, s4_meta=None, input_meta=None):
                                              ap=spec_hw_val//meta.expand, 
                                              bg=bg_hw_val)
 
+    # Locate the S4 metadata files for all of the aperture pairs at once
+    s4_meta_files = find_s4_meta_files(meta)
+
     for spec_hw_val in meta.spec_hw_range:
         for bg_hw_val in meta.bg_hw_range:
 
@@ -135,7 +138,7 @@ def fitlc(eventlabel, ecf_path=None, s4_meta=None, input_meta=None):
             meta.bg_hw = bg_hw_val
 
             # Load in the S4 metadata used for this particular aperture pair
-            meta = load_specific_s4_meta_info(meta)
+            meta = load_specific_s4_meta_info(meta, s4_meta_files)
             filename_S4_hold = meta.filename_S4_LCData.split(os.sep)[-1]
             lc = xrio.readXR(meta.inputdir+os.sep+filename_S4_hold)
 
@@ -363,9 +366,17 @@ def fitlc(eventlabel, ecf_path=None, s4_meta=None, input_meta=None):
             if meta.multwhite:
                 log.writelog("\nStarting Shared Fit of White Lights\n")
 
-                flux = np.ma.masked_array([])
-                flux_err = np.ma.masked_array([])
-                time = np.ma.masked_array([])
+                # Subtract the time offset from all of the white light
+                # curves at once
+                time_mask = np.concatenate([lc_white.mask.values[0, :]
+                                            for lc_white in lc_whites])
+                time = np.concatenate([lc_white.time.values
+                                       for lc_white in lc_whites])
+                np.subtract(time, offset, out=time)
+                time = np.ma.masked_where(time_mask, time)
+
+                flux = []
+                flux_err = []
                 xpos = np.ma.masked_array([])
                 ypos = np.ma.masked_array([])
                 xwidth = np.ma.masked_array([])
@@ -373,17 +384,14 @@ def fitlc(eventlabel, ecf_path=None, s4_meta=None, input_meta=None):
 
                 for pi in range(len(meta.inputdirlist)+1):
                     mask = lc_whites[pi].mask.values[0, :]
-                    time_temp = lc_whites[pi].time.values - offset
-                    time_temp = np.ma.masked_where(mask, time_temp)
                     flux_temp = np.ma.masked_where(
                         mask, lc_whites[pi].data.values[0, :])
                     err_temp = np.ma.masked_where(
                         mask, lc_whites[pi].err.values[0, :])
                     flux_temp, err_temp = util.normalize_spectrum(
                         meta, flux_temp, err_temp, mask)
-                    flux = np.ma.append(flux, flux_temp)
-                    flux_err = np.ma.append(flux_err, err_temp)
-                    time = np.ma.append(time, time_temp)
+                    flux.append(flux_temp)
+                    flux_err.append(err_temp)
 
                     if hasattr(lc_whites[pi], 'centroid_x'):
                         xpos_temp = np.ma.masked_invalid(
@@ -415,6 +423,9 @@ def fitlc(eventlabel, ecf_path=None, s4_meta=None, input_meta=None):
                     xwidth = np.ma.append(xwidth, xwidth_temp)
                     ywidth = np.ma.append(ywidth, ywidth_temp)
 
+                flux = np.ma.concatenate(flux)
+                flux_err = np.ma.concatenate(flux_err)
+
                 meta, params = fit_channel(meta, time, flux, 0, flux_err,
                                            eventlabel, params, log,
                                            longparamlist, time_units,
@@ -435,19 +446,17 @@ def fitlc(eventlabel, ecf_path=None, s4_meta=None, input_meta=None):
 
                 log.writelog(f"\nStarting Shared Fit of {chanrng} Channels\n")
 
-                flux = np.ma.masked_array([])
-                flux_err = np.ma.masked_array([])
-                for channel in range(chanrng):
-                    mask = lc.mask.values[channel, :]
-                    flux_temp = np.ma.masked_where(mask,
-                                                   lc.data.values[channel, :])
-                    err_temp = np.ma.masked_where(mask,
-                                                  lc.err.values[channel, :])
-                    flux_temp, err_temp = util.normalize_spectrum(
-                        meta, flux_temp, err_temp,
-                        scandir=getattr(lc, 'scandir', None))
-                    flux = np.ma.append(flux, flux_temp)
-                    flux_err = np.ma.append(flux_err, err_temp)
+                # Normalize all of the channels at once (with time along the
+                # first axis) and then flatten them channel by channel
+                mask = lc.mask.values[:chanrng, :].T
+                flux = np.ma.masked_where(mask, lc.data.values[:chanrng, :].T)
+                flux_err = np.ma.masked_where(mask,
+                                              lc.err.values[:chanrng, :].T)
+                flux, flux_err = util.normalize_spectrum(
+                    meta, flux, flux_err,
+                    scandir=getattr(lc, 'scandir', None))
+                flux = flux.T.ravel()
+                flux_err = flux_err.T.ravel()
 
                 meta, params = fit_channel(meta, time, flux, 0, flux_err,
                                            eventlabel, params, log,
@@ -460,25 +469,29 @@ def fitlc(eventlabel, ecf_path=None, s4_meta=None, input_meta=None):
                 me.saveevent(meta, (meta.outputdir+'S5_'+meta.eventlabel +
                                     "_Meta_Save"), save=[])
             else:
+                # Normalize flux and uncertainties of all of the channels
+                # at once (with time along the first axis) to avoid large
+                # flux values
+                masks = lc.mask.values[:chanrng, :].T
+                fluxes = np.ma.masked_where(masks,
+                                            lc.data.values[:chanrng, :].T)
+                flux_errs = np.ma.masked_where(masks,
+                                               lc.err.values[:chanrng, :].T)
+                fluxes, flux_errs = util.normalize_spectrum(
+                    meta, fluxes, flux_errs,
+                    scandir=getattr(lc, 'scandir', None))
+
                 for channel in range(chanrng):
                     log.writelog(f"\nStarting Channel {channel} of "
                                  f"{chanrng}\n")
 
                     # Get the flux and error measurements for
                     # the current channel
-                    mask = lc.mask.values[channel, :]
-                    flux = np.ma.masked_where(mask,
-                                              lc.data.values[channel, :])
-                    flux_err = np.ma.masked_where(mask,
-                                                  lc.err.values[channel, :])
+                    mask = masks[:, channel]
+                    flux = fluxes[:, channel]
+                    flux_err = flux_errs[:, channel]
                     time_temp = np.ma.masked_where(mask, time)
 
-                    # Normalize flux and uncertainties to avoid large
-                    # flux values
-                    flux, flux_err = util.normalize_spectrum(
-                        meta, flux, flux_err,
-                        scandir=getattr(lc, 'scandir', None))
-
                     meta, params = fit_channel(meta, time_temp, flux, channel,
                                                flux_err, eventlabel, params,
                                                log, longparamlist, time_units,
@@ -1081,39 +1094,70 @@ def make_longparamlist(meta, params, chanrng):
         nspecchan = 1
 
     longparamlist = [[] for i in range(nspecchan)]
-    tlist = list(params.dict.keys())
-    for param in tlist:
-        if 'free' in params.dict[param]:
+    tlist = set(params.dict.keys())
+    # Parameters the user specifically set for a channel get handled
+    # along with channel 0's parameter, so we don't set them twice
+    skip = set()
+    for param, value in list(params.dict.items()):
+        if param in skip:
+            continue
+        if 'free' in value:
             longparamlist[0].append(param)
-            for c in np.arange(nspecchan-1):
-                title = param+'_'+str(c+1)
+            for c in range(1, nspecchan):
+                title = param+'_'+str(c)
                 if title in tlist:
                     # The user specifically set this channel's parameter
-                    longparamlist[c+1].append(title)
-                    # Remove this parameter from tlist so we don't set it twice
-                    tlist.remove(title)
+                    skip.add(title)
                 else:
                     # Set this parameter based on channel 0's parameter
-                    params.__setattr__(title, params.dict[param])
-                    longparamlist[c+1].append(title)
-        elif 'shared' in params.dict[param]:
-            for c in np.arange(nspecchan):
-                longparamlist[c].append(param)
+                    params.__setattr__(title, value)
+                longparamlist[c].append(title)
         else:
-            for c in np.arange(nspecchan):
-                longparamlist[c].append(param)
+            # Shared and fixed parameters are the same for all channels
+            for chanlist in longparamlist:
+                chanlist.append(param)
     paramtitles = longparamlist[0]
 
     return longparamlist, paramtitles
 
 
-def load_specific_s4_meta_info(meta):
+def find_s4_meta_files(meta):
+    """Locate the S4 metadata save files of all aperture pairs in one search.
+
+    Parameters
+    ----------
+    meta : eureka.lib.readECF.MetaClass
+        The current metadata object.
+
+    Returns
+    -------
+    dict
+        The S4 metadata save files found in each aperture pair's folder,
+        keyed by the folder path (including a trailing separator).
+    """
+    inputdir = os.sep.join(meta.inputdir.split(os.sep)[:-2]) + os.sep
+    fnames = glob(inputdir+'*'+os.sep+'S4_'+meta.eventlabel +
+                  '*_Meta_Save.dat')
+
+    s4_meta_files = {}
+    for fname in fnames:
+        folder = os.path.dirname(fname)+os.sep
+        s4_meta_files.setdefault(folder, []).append(fname)
+
+    return s4_meta_files
+
+
+def load_specific_s4_meta_info(meta, s4_meta_files=None):
     """Load the specific S4 MetaClass object used to make this aperture pair.
 
     Parameters
     ----------
     meta : eureka.lib.readECF.MetaClass
         The current metadata object.
+    s4_meta_files : dict; optional
+        The S4 metadata save files in each aperture pair's folder, as
+        returned by find_s4_meta_files. Defaults to None which searches
+        for the file of this aperture pair.
 
     Returns
     -------
@@ -1131,8 +1175,12 @@ def load_specific_s4_meta_info(meta):
     # Locate the old MetaClass savefile, and load new ECF into
     # that old MetaClass
     meta.inputdir = inputdir
+    if s4_meta_files is not None:
+        fnames = s4_meta_files.get(inputdir)
+    else:
+        fnames = None
     s4_meta, meta.inputdir, meta.inputdir_raw = \
-        me.findevent(meta, 'S4', allowFail=False)
+        me.findevent(meta, 'S4', allowFail=False, fnames=fnames)
     filename_S4_LCData = s4_meta.filename_S4_LCData
     # Merge S5 meta into old S4 meta
     meta = me.mergeevents(meta, s4_meta)
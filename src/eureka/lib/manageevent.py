@@ -149,7 +149,7 @@ def updateevent(event, filename, add):
     return event
 
 
-def findevent(meta, stage, allowFail=False):
+def findevent(meta, stage, allowFail=False, fnames=None):
     """Loads in an earlier stage meta file.
 
     Parameters
@@ -162,6 +162,10 @@ def findevent(meta, stage, allowFail=False):
         Whether to allow the code to find no previous stage metadata files
         (for S2, S3) or throw an error if no metadata files are found.
         Default is False.
+    fnames : list; optional
+        The metadata save files in the inputdir if they have already been
+        located, in which case the inputdir is not searched again.
+        Defaults to None which searches the inputdir.
 
     Returns
     -------
@@ -188,8 +192,9 @@ def findevent(meta, stage, allowFail=False):
     """
     # Search for the output metadata in the inputdir provided
     # First just check the specific inputdir folder
-    fnames = glob.glob(meta.inputdir+stage+'_'+meta.eventlabel +
-                       '*_Meta_Save.dat')
+    if fnames is None:
+        fnames = glob.glob(meta.inputdir+stage+'_'+meta.eventlabel +
+                           '*_Meta_Save.dat')
     if len(fnames) == 0:
         # There were no metadata files in that folder, so let's see if there
         # are in children folders
@@ -229,8 +234,8 @@ def findevent(meta, stage, allowFail=False):
     # Load old savefile
     old_meta = loadevent(fname)
 
-    old_meta.folder = os.sep.join(fname.split(os.sep)[:-1])+os.sep
-    old_meta.filename = fname.split(os.sep)[-1]
+    old_meta.folder = os.path.dirname(fname)+os.sep
+    old_meta.filename = os.path.basename(fname)
 
     return old_meta, old_meta.folder, old_meta.folder[len(meta.topdir):]
 
@@ -280,15 +280,14 @@ class MetaClass:
         """
         # Copy ecf (and update inputdir to be precise which exact inputs
         # were used)
+        new_lines = []
+        for line in self.lines:
+            line_segs = line.split()
+            if len(line_segs) != 0 and line_segs[0] == 'inputdir':
+                line = (line_segs[0]+'\t\t'+self.inputdir_raw+'\t' +
+                        ' '.join(line_segs[2:])+'\n')
+            new_lines.append(line)
+
         new_ecfname = os.path.join(self.outputdir, self.filename)
         with open(new_ecfname, 'w') as new_file:
-            for line in self.lines:
-                if len(line.strip()) == 0 or line.strip()[0] == '#':
-                    new_file.write(line)
-                else:
-                    line_segs = line.strip().split()
-                    if line_segs[0] == 'inputdir':
-                        new_file.write(line_segs[0]+'\t\t'+self.inputdir_raw +
-                                       '\t'+' '.join(line_segs[2:])+'\n')
-                    else:
-                        new_file.write(line)
+            new_file.writelines(new_lines)
@@ -1,5 +1,8 @@
 import re
 
+# Splits a string into its runs of digits and the text in between
+_DIGITS = re.compile('([0-9]+)')
+
 
 def tryint(s):
     """Turn a string into an int if possible.
@@ -34,7 +37,10 @@ def alphanum_key(s):
     list
         The string broken into a list of strings and ints.
     """
-    return [tryint(c) for c in re.split('([0-9]+)', s)]
+    # Every other chunk is a run of digits, while the text chunks never
+    # contain ASCII digits, so they can only be numbers if not plain ASCII
+    return [int(c) if i % 2 else (c if c.isascii() else tryint(c))
+            for i, c in enumerate(_DIGITS.split(s))]
 
 
 def sort_nicely(list1):
@@ -1,6 +1,6 @@
 import numpy as np
 import os
-import glob
+import functools
 from astropy.io import fits
 from . import sort_nicely as sn
 from scipy.interpolate import griddata
@@ -25,6 +25,101 @@ COMMON_IMPORTS = np.array([
 ], dtype=object)
 
 
+def _iter_files(folder, suffix_full):
+    """Lazily find the files directly in a folder whose names end in
+    suffix_full.
+
+    Parameters
+    ----------
+    folder : str
+        The folder to search.
+    suffix_full : str
+        The required end of the filenames (e.g. 'calints.fits').
+
+    Yields
+    ------
+    os.DirEntry
+        The entry of each matching file. Like glob, hidden files are skipped
+        and a missing or unreadable folder yields nothing.
+    """
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if (entry.name.endswith(suffix_full)
+                        and not entry.name.startswith('.')
+                        and entry.is_file()):
+                    yield entry
+    except OSError:
+        return
+
+
+def _scan_files(folder, suffix_full):
+    """List the files directly in a folder whose names end in suffix_full.
+
+    Parameters
+    ----------
+    folder : str
+        The folder to search.
+    suffix_full : str
+        The required end of the filenames (e.g. 'calints.fits').
+
+    Returns
+    -------
+    list
+        The paths of the matching files, sorted nicely. Like glob, hidden
+        files are skipped and a missing or unreadable folder gives an empty
+        list.
+    """
+    # All of the paths share the same folder, so only sort on the (much
+    # shorter) filenames
+    entries = list(_iter_files(folder, suffix_full))
+    entries.sort(key=lambda entry: sn.alphanum_key(entry.name))
+    return [entry.path for entry in entries]
+
+
+def _scan_fits_folders(folder, suffix_full, folders, folder_entry=None):
+    """Recursively find the folders containing files ending in suffix_full.
+
+    Parameters
+    ----------
+    folder : str
+        The folder to search.
+    suffix_full : str
+        The required end of the filenames (e.g. 'calints.fits').
+    folders : dict
+        Updated in place with the modification time of each folder that
+        contains matching files, keyed by the folder path (without a trailing
+        separator).
+    folder_entry : os.DirEntry; optional
+        The entry of folder from scanning its parent folder. Defaults to None
+        in which case os.stat is used to get the modification time of folder.
+    """
+    subfolders = []
+    mtime = None
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                # Like glob, skip hidden files and folders
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir():
+                    subfolders.append(entry)
+                elif (mtime is None and entry.name.endswith(suffix_full)
+                        and entry.is_file()):
+                    # Only stat the folders that contain matching files
+                    if folder_entry is not None:
+                        mtime = folder_entry.stat().st_mtime
+                    else:
+                        mtime = os.stat(folder).st_mtime
+                    folders[os.path.dirname(entry.path)] = mtime
+    except OSError:
+        # Like glob, skip missing or unreadable folders
+        return
+
+    for entry in subfolders:
+        _scan_fits_folders(entry.path, suffix_full, folders, entry)
+
+
 def readfiles(meta, log):
     """Read in the files saved in topdir + inputdir and save them to a list.
 
@@ -41,11 +136,10 @@ def readfiles(meta, log):
         The metadata object with added segment_list containing the sorted
         data fits files.
     """
-    meta.segment_list = []
+    suffix_full = meta.suffix+'.fits'
 
     # Look for files in the input directory
-    for fname in glob.glob(meta.inputdir+'*'+meta.suffix+'.fits'):
-        meta.segment_list.append(fname)
+    meta.segment_list = _scan_files(meta.inputdir, suffix_full)
 
     # Need to allow for separated sci and cal directories for WFC3
     if len(meta.segment_list) == 0:
@@ -53,16 +147,15 @@ def readfiles(meta, log):
         if not hasattr(meta, 'sci_dir') or meta.sci_dir is None:
             meta.sci_dir = 'sci'
         sci_path = os.path.join(meta.inputdir, meta.sci_dir)+os.sep
-        for fname in glob.glob(sci_path+'*'+meta.suffix+'.fits'):
-            meta.segment_list.append(fname)
         # Add files from the cal directory if present
         if not hasattr(meta, 'cal_dir') or meta.cal_dir is None:
             meta.cal_dir = 'cal'
         cal_path = os.path.join(meta.inputdir, meta.cal_dir)+os.sep
-        for fname in glob.glob(cal_path+'*'+meta.suffix+'.fits'):
-            meta.segment_list.append(fname)
+        # Each folder's files are already sorted, so just order the folders
+        for path in sn.sort_nicely([sci_path, cal_path]):
+            meta.segment_list.extend(_scan_files(path, suffix_full))
 
-    meta.segment_list = np.array(sn.sort_nicely(meta.segment_list))
+    meta.segment_list = np.array(meta.segment_list)
 
     meta.num_data_files = len(meta.segment_list)
     if meta.num_data_files == 0:
@@ -102,12 +195,16 @@ def trim(data, meta):
     meta : eureka.lib.readECF.MetaClass
         The metadata object.
     """
-    subdata = data.isel(y=np.arange(meta.ywindow[0], meta.ywindow[1]),
-                        x=np.arange(meta.xwindow[0], meta.xwindow[1]))
-    meta.subny = meta.ywindow[1] - meta.ywindow[0]
-    meta.subnx = meta.xwindow[1] - meta.xwindow[0]
+    y0, y1 = meta.ywindow[0], meta.ywindow[1]
+    x0, x1 = meta.xwindow[0], meta.xwindow[1]
+
+    # Slicing (rather than indexing with arrays) gives views of the
+    # original arrays instead of copies
+    subdata = data.isel(y=slice(y0, y1), x=slice(x0, x1))
+    meta.subny = y1 - y0
+    meta.subnx = x1 - x0
     if meta.inst == 'wfc3':
-        subdata['guess'] = subdata.guess - meta.ywindow[0]
+        subdata['guess'] = subdata.guess - y0
 
     return subdata, meta
 
@@ -161,7 +258,7 @@ def check_nans(data, mask, log, name=''):
     ----------
     data : ndarray
         a data-like array (e.g. data, err, dq, ...).
-    mask : ndarray
+    mask : ndarray or xarray.DataArray
         Input mask.
     log : logedit.Logedit
         The open log in which NaNs/Infs will be mentioned, if existent.
@@ -171,25 +268,26 @@ def check_nans(data, mask, log, name=''):
 
     Returns
     -------
-    mask : ndarray
+    mask : ndarray or xarray.DataArray
         Output mask where 0 will be written where the input data array has NaNs
-        or infs.
+        or infs. Only those pixels are masked, also for DataArray masks.
     """
-    data = np.ma.masked_where(mask == 0, np.copy(data))
-    masked = np.ma.masked_invalid(data).mask
-    inan = np.where(masked)
-    num_nans = np.sum(masked)
+    # Find the pixels that are already masked or are NaN/inf in one pass
+    masked = ~np.isfinite(np.asarray(data))
+    masked |= np.asarray(mask) == 0
+    num_nans = np.count_nonzero(masked)
     num_pixels = np.size(data)
     perc_nans = 100*num_nans/num_pixels
     if num_nans > 0 and name == 'wavelength':
         log.writelog(f"  WARNING: Your {name} array has {num_nans} NaNs, which"
                      f" are outside of the wavelength solution. You should "
-                     f"consider removing indices {inan} as their data quality "
-                     f"may be poor.")
+                     f"consider removing indices {np.where(masked)} as their "
+                     f"data quality may be poor.")
     elif num_nans > 0:
         log.writelog(f"  {name} has {num_nans} NaNs/infs, which is "
                      f"{perc_nans:.2f}% of all pixels.")
-        mask[inan] = 0
+        # Writes through to the underlying array if mask is an xarray object
+        np.asarray(mask)[masked] = 0
     if perc_nans > 10:
         log.writelog("  WARNING: Your region of interest may be off the edge "
                      "of the detector subarray.  Masking NaN/inf regions and "
@@ -221,46 +319,41 @@ def makedirectory(meta, stage, counter=None, **kwargs):
     """
     # This code allows the input and output files to be stored outside
     # of the Eureka! folder
-    rootdir = os.path.join(meta.topdir, *meta.outputdir_raw.split(os.sep))
-    if rootdir[-1] != os.sep:
-        rootdir += os.sep
-
-    outputdir = rootdir+stage+'_'+meta.datetime+'_'+meta.eventlabel+'_run'
+    rootdir = os.path.join(meta.topdir, *meta.outputdir_raw.split(os.sep), '')
+    prefix = stage+'_'+meta.datetime+'_'+meta.eventlabel+'_run'
 
     if counter is None:
+        # Read rootdir once to find the existing run numbers rather than
+        # checking whether each run number exists in turn
+        try:
+            with os.scandir(rootdir) as entries:
+                runs = {entry.name[len(prefix):] for entry in entries
+                        if entry.name.startswith(prefix)}
+        except OSError:
+            # No previous runs can be found (e.g. rootdir doesn't exist
+            # yet), and any problems with rootdir are reported below
+            runs = set()
         counter = 1
-        while os.path.exists(outputdir+str(counter)):
+        while str(counter) in runs:
             counter += 1
-        outputdir += str(counter)+os.sep
-    else:
-        outputdir += str(counter)+os.sep
 
     # Nest the different folders underneath one main folder for this run
-    for key, value in kwargs.items():
-        outputdir += key+str(value)+'_'
-
-    # Remove trailing _ if present
-    if outputdir[-1] == '_':
-        outputdir = outputdir[:-1]
-
-    # Add trailing slash
-    if outputdir[-1] != os.sep:
-        outputdir += os.sep
-
-    if not os.path.exists(outputdir):
-        try:
-            os.makedirs(outputdir)
-        except (PermissionError, OSError) as e:
-            # Raise a more helpful error message so that users know to update
-            # topdir in their ecf file
-            message = (f'You do not have the permissions to make the folder '
-                       f'{outputdir}\nYour topdir is currently set to'
-                       f'{meta.topdir}, but your user account is called '
-                       f'{os.getenv("USER")}.\nYou likely need to update the '
-                       f'topdir setting in your {stage} .ecf file.')
-            raise PermissionError(message) from e
-    if not os.path.exists(os.path.join(outputdir, "figs")):
-        os.makedirs(os.path.join(outputdir, "figs"))
+    # (with a trailing slash)
+    subfolder = '_'.join(key+str(value) for key, value in kwargs.items())
+    outputdir = os.path.join(rootdir, prefix+str(counter), subfolder, '')
+
+    try:
+        os.makedirs(outputdir, exist_ok=True)
+    except (PermissionError, OSError) as e:
+        # Raise a more helpful error message so that users know to update
+        # topdir in their ecf file
+        message = (f'You do not have the permissions to make the folder '
+                   f'{outputdir}\nYour topdir is currently set to'
+                   f'{meta.topdir}, but your user account is called '
+                   f'{os.getenv("USER")}.\nYou likely need to update the '
+                   f'topdir setting in your {stage} .ecf file.')
+        raise PermissionError(message) from e
+    os.makedirs(os.path.join(outputdir, "figs"), exist_ok=True)
 
     return counter
 
@@ -294,25 +387,54 @@ def pathdirectory(meta, stage, run, old_datetime=None, **kwargs):
     else:
         datetime = meta.datetime
 
-    # This code allows the input and output files to be stored outside
-    # of the Eureka! folder
-    rootdir = os.path.join(meta.topdir, *meta.outputdir_raw.split(os.sep))
-    if rootdir[-1] != os.sep:
-        rootdir += os.sep
+    # The values are converted to strings first so that e.g. ap=4 and
+    # ap=4.0 don't share a cache entry
+    return _pathdirectory(meta.topdir, meta.outputdir_raw, stage, datetime,
+                          meta.eventlabel, str(run),
+                          tuple((key, str(value))
+                                for key, value in kwargs.items()))
+
 
-    outputdir = (rootdir+stage+'_'+datetime+'_'+meta.eventlabel+'_run' +
-                 str(run)+os.sep)
+@functools.lru_cache(maxsize=256)
+def _pathdirectory(topdir, outputdir_raw, stage, datetime, eventlabel, run,
+                   kwargs_items):
+    """Builds the directory path for pathdirectory.
 
-    for key, value in kwargs.items():
-        outputdir += key+str(value)+'_'
+    This is cached since pathdirectory is repeatedly called with the same
+    arguments throughout the pipeline.
 
-    # Remove trailing _ if present
-    if outputdir[-1] == '_':
-        outputdir = outputdir[:-1]
+    Parameters
+    ----------
+    topdir : str
+        The meta.topdir of the run.
+    outputdir_raw : str
+        The meta.outputdir_raw of the run.
+    stage : str
+        'S#' string denoting stage number (i.e. 'S3', 'S4')
+    datetime : str
+        The date of the run.
+    eventlabel : str
+        The meta.eventlabel of the run.
+    run : str
+        The run number.
+    kwargs_items : tuple
+        The (key, value) string pairs to add to the folder name, in order.
+
+    Returns
+    -------
+    path : str
+        Directory path for given parameters
+    """
+    # This code allows the input and output files to be stored outside
+    # of the Eureka! folder
+    rootdir = os.path.join(topdir, *outputdir_raw.split(os.sep))
 
-    # Add trailing slash
-    if outputdir[-1] != os.sep:
-        outputdir += os.sep
+    # Nest the different folders underneath one main folder for this run
+    # (with a trailing slash)
+    subfolder = '_'.join(key+value for key, value in kwargs_items)
+    outputdir = os.path.join(rootdir,
+                             stage+'_'+datetime+'_'+eventlabel+'_run'+run,
+                             subfolder, '')
 
     return outputdir
 
@@ -338,15 +460,18 @@ def find_fits(meta):
     - April 25, 2022 Taylor Bell
         Initial version.
     '''
-    fnames = glob.glob(meta.inputdir+'*'+meta.suffix + '.fits')
-    if len(fnames) == 0:
+    suffix_full = meta.suffix+'.fits'
+    # Only one file is needed to know that the inputdir has the files
+    entry = next(_iter_files(meta.inputdir, suffix_full), None)
+    if entry is not None:
+        folders = {os.path.dirname(entry.path): None}
+    else:
         # There were no rateints files in that folder, so let's see if
         # there are in children folders
-        fnames = glob.glob(meta.inputdir+'**'+os.sep+'*'+meta.suffix+'.fits',
-                           recursive=True)
-        fnames = sn.sort_nicely(fnames)
+        folders = {}
+        _scan_fits_folders(meta.inputdir, suffix_full, folders)
 
-    if len(fnames) == 0:
+    if len(folders) == 0:
         # If the code can't find any of the reqested files, raise an error
         # and give a helpful message
         message = (f'Unable to find any "{meta.suffix}.fits" files in the '
@@ -355,11 +480,15 @@ def find_fits(meta):
                    f'containing the "{meta.suffix}.fits" files.')
         raise AssertionError(message)
 
-    folders = np.unique([os.sep.join(fname.split(os.sep)[:-1])
-                         for fname in fnames])
-    if len(folders) >= 1:
-        # get the file with the latest modified time
-        folder = max(folders, key=os.path.getmtime)
+    if len(folders) == 1:
+        folder = next(iter(folders))
+    else:
+        # get the folder with the latest modified time (or the first one
+        # alphabetically if there is a tie) without sorting all the folders;
+        # the times were already recorded while walking the folders
+        latest = max(folders.values())
+        folder = min(folder for folder, mtime in folders.items()
+                     if mtime == latest)
 
     if len(folders) > 1:
         # There may be multiple runs - use the most recent but warn the user
@@ -488,15 +617,16 @@ def normalize_spectrum(meta, optspec, opterr=None, optmask=None, scandir=None):
             iscans = np.where(scandir == p)[0]
             if len(iscans) > 0:
                 for r in range(meta.nreads):
+                    iread = iscans[r::meta.nreads]
+                    mean = np.ma.mean(normspec[iread], axis=0)
                     if opterr is not None:
-                        normerr[iscans[r::meta.nreads]] /= np.ma.mean(
-                            normspec[iscans[r::meta.nreads]], axis=0)
-                    normspec[iscans[r::meta.nreads]] /= np.ma.mean(
-                        normspec[iscans[r::meta.nreads]], axis=0)
+                        normerr[iread] /= mean
+                    normspec[iread] /= mean
     else:
+        mean = np.ma.mean(normspec, axis=0)
         if opterr is not None:
-            normerr = normerr/np.ma.mean(normspec, axis=0)
-        normspec = normspec/np.ma.mean(normspec, axis=0)
+            normerr = normerr/mean
+        normspec = normspec/mean
 
     if opterr is not None:
         return normspec, normerr
@@ -544,35 +674,33 @@ def get_mad(meta, log, wave_1d, optspec, optmask=None,
     mad : float
         Single MAD value in ppm
     """
-    optspec = np.ma.masked_invalid(optspec)
-    optspec = np.ma.masked_where(optmask, optspec)
-
     if wave_min is not None:
-        iwmin = np.argmin(np.abs(wave_1d-wave_min))
+        iwmin = nearest_index(wave_1d, wave_min)
     else:
         iwmin = 0
     if wave_max is not None:
-        iwmax = np.argmin(np.abs(wave_1d-wave_max))
+        iwmax = nearest_index(wave_1d, wave_max)
     else:
         iwmax = None
 
-    # Normalize the spectrum
-    normspec = normalize_spectrum(meta, optspec[:, iwmin:iwmax],
-                                  optmask=optmask[:, iwmin:iwmax],
-                                  scandir=scandir)
-
     if meta.inst == 'wfc3':
-        # Setup 1D MAD arrays
+        # Normalize the spectrum (which also masks the invalid values and
+        # optmask, but only within the wavelength range)
+        normspec = normalize_spectrum(meta, optspec[:, iwmin:iwmax],
+                                      optmask=optmask[:, iwmin:iwmax],
+                                      scandir=scandir)
+
+        # Setup 1D MAD arrays (only the rows of the scan directions that
+        # are present get filled and used, so they needn't be zeroed)
         n_wav = normspec.shape[1]
-        ediff = np.ma.zeros((2, n_wav))
+        ediff = np.ma.empty((2, n_wav))
 
         # Compute the MAD for each scan direction
         for p in range(2):
             iscans = np.where(scandir == p)[0]
             if len(iscans) > 0:
-                # Compute the MAD
-                for m in range(n_wav):
-                    ediff[p, m] = get_mad_1d(normspec[iscans, m])
+                # Compute the MAD for all wavelengths at once
+                ediff[p] = get_mad_2d(normspec[iscans])
 
                 mad = np.ma.mean(ediff[p])
                 log.writelog(f"Scandir {p} MAD = {int(np.round(mad))} ppm")
@@ -585,17 +713,85 @@ def get_mad(meta, log, wave_1d, optspec, optmask=None,
             # Collapse the MAD along the scan direction
             ediff = np.mean(ediff, axis=0)
     else:
-        # Setup 1D MAD array
-        n_wav = normspec.shape[1]
-        ediff = np.ma.zeros(n_wav)
-
-        # Compute the MAD
-        for m in range(n_wav):
-            ediff[m] = get_mad_1d(normspec[:, m])
+        # Mask the invalid values and optmask within the wavelength range
+        # using a new mask, so that the spectrum isn't copied and the mask
+        # of optspec (if any) isn't changed
+        subspec = optspec[:, iwmin:iwmax]
+        submask = (np.ma.getmaskarray(subspec) |
+                   ~np.isfinite(np.ma.getdata(subspec)))
+        submask |= np.asarray(optmask[:, iwmin:iwmax], dtype=bool)
+        subspec = np.ma.masked_array(np.ma.getdata(subspec), mask=submask)
+
+        # Normalizing each wavelength by its temporal mean just rescales
+        # its differences along time, so rather than making a normalized
+        # copy of the spectrum, rescale the MAD of each wavelength instead
+        mean = np.ma.mean(subspec, axis=0)
+        ediff = get_mad_2d(subspec)/np.ma.abs(mean)
 
     return np.ma.mean(ediff)
 
 
+def get_mad_2d(data):
+    """Computes variation on median absolute deviation (MAD) using ediff1d
+    along the time axis of 2D data.
+
+    This gives the same values as calling get_mad_1d on each column of data,
+    but without looping over the columns.
+
+    Parameters
+    ----------
+    data : ndarray
+        The 2D array (time, nx) from which to calculate MAD.
+
+    Returns
+    -------
+    mad : ndarray
+        The MAD value in ppm of each column.
+    """
+    data = np.ma.asanyarray(data)
+    return 1e6 * np.ma.median(np.ma.abs(data[1:] - data[:-1]), axis=0)
+
+
+def nearest_index(array, value):
+    """Find the index of the element of a monotonic array nearest to value.
+
+    This gives the same index as np.argmin(np.abs(array-value)), but uses a
+    binary search instead of scanning the whole array.
+
+    Parameters
+    ----------
+    array : ndarray
+        The 1D monotonically increasing or decreasing array (e.g. wave_1d).
+    value : float
+        The value to look for.
+
+    Returns
+    -------
+    index : int
+        The index of the nearest element (the lowest index if there is a
+        tie).
+    """
+    n = len(array)
+    if not (np.isfinite(array[0]) and np.isfinite(array[-1])):
+        # The ends of the array are not valid (e.g. NaNs outside of the
+        # wavelength solution), so fall back to checking every element
+        return np.argmin(np.abs(array-value))
+
+    descending = array[0] > array[-1]
+    if descending:
+        # searchsorted requires increasing values
+        array = array[::-1]
+    i = np.searchsorted(array, value)
+    below, above = array[max(i-1, 0)], array[min(i, n-1)]
+    if descending:
+        # ties go to the larger value, which comes first in the original
+        nearest = above if abs(above-value) <= abs(below-value) else below
+        return n-np.searchsorted(array, nearest, side='right')
+    else:
+        nearest = below if abs(below-value) <= abs(above-value) else above
+        return np.searchsorted(array, nearest)
+
+
 def get_mad_1d(data, ind_min=0, ind_max=None):
     """Computes variation on median absolute deviation (MAD) using ediff1d
     for 1D data.
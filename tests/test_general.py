@@ -5,7 +5,7 @@ import sys
 import os
 
 sys.path.insert(0, '..'+os.sep+'src'+os.sep)
-from eureka.lib import util
+from eureka.lib import util, logedit
 from eureka.lib.readECF import MetaClass
 from eureka.lib.medstddev import medstddev
 import astraeus.xarrayIO as xrio
@@ -50,6 +50,134 @@ def test_trim(capsys):
                                   (trim_x1 - trim_x0))
 
 
+def test_find_fits(capsys):
+    # eureka.lib.util.find_fits test
+    topdir = f'.{os.sep}data{os.sep}'
+    inputdir = os.path.join('find_fits', '')
+
+    # Make some nested folders with (empty) calints files, plus a hidden
+    # folder and a hidden file which should both be ignored
+    folders = {os.path.join('a', 'run1'): 1e9,
+               os.path.join('a', 'run2'): 1e9+20,
+               os.path.join('b', 'deep', 'run3'): 1e9+10,
+               '.hidden': 1e9+30,
+               'c': 1e9+40}
+    for folder in folders:
+        os.makedirs(os.path.join(topdir, inputdir, folder))
+    for folder in list(folders)[:4]:
+        open(os.path.join(topdir, inputdir, folder, 'seg001_calints.fits'),
+             'w').close()
+    open(os.path.join(topdir, inputdir, 'c', '.seg001_calints.fits'),
+         'w').close()
+    # Set the modification times after adding the files
+    for folder, mtime in folders.items():
+        os.utime(os.path.join(topdir, inputdir, folder), (mtime, mtime))
+
+    meta = MetaClass()
+    meta.suffix = 'calints'
+    meta.topdir = topdir
+    meta.inputdir = topdir+inputdir
+    meta = util.find_fits(meta)
+
+    # The visible folder with the latest modification time should be used
+    expected = os.path.join(inputdir, 'a', 'run2')
+    assert meta.inputdir == os.path.join(topdir+expected, '')
+    assert meta.inputdir_raw == expected
+
+    # A folder which directly contains the files should be used as is
+    meta.inputdir = os.path.join(topdir, inputdir, 'b', 'deep', 'run3', '')
+    meta = util.find_fits(meta)
+    assert meta.inputdir == os.path.join(topdir, inputdir, 'b', 'deep',
+                                         'run3', '')
+
+    # Remove the temporary folders
+    os.system(f"rm -r {topdir+inputdir}")
+
+
+def test_check_nans(capsys):
+    # eureka.lib.util.check_nans test
+
+    log = logedit.Logedit(f'.{os.sep}data{os.sep}test.log')
+
+    nt = 3
+    ny = 4
+    nx = 5
+    flux = np.ones((nt, ny, nx))
+    flux[0, 1, 2] = np.nan
+    flux[1, 2, 3] = np.inf
+    flux[2, 3, 1] = np.nan
+    expected = np.isfinite(flux)
+
+    # Only the NaN/inf pixels should be masked in an ndarray mask
+    mask = np.ones(flux.shape, dtype=bool)
+    mask = util.check_nans(flux, mask, log, name='FLUX')
+    np.testing.assert_array_equal(mask, expected)
+
+    # The same should be true for an xarray mask, like the ones used for WFC3
+    time = np.arange(nt)
+    data = xrio.makeDataset()
+    data['flux'] = xrio.makeFluxLikeDA(flux, time, 'electrons', 'timeless',
+                                       name='flux')
+    data['mask'] = (['time', 'y', 'x'], np.ones(flux.shape, dtype=bool))
+    data['mask'] = util.check_nans(data['flux'], data['mask'], log,
+                                   name='FLUX')
+    np.testing.assert_array_equal(data['mask'].values, expected)
+
+    # Remove the temporary log file
+    os.system(f"rm .{os.sep}data{os.sep}test.log")
+
+
+def test_get_mad_2d(capsys):
+    # eureka.lib.util.get_mad_2d test
+    data = np.array([[0., 0.],
+                     [1., 2.],
+                     [3., 2.]])
+    mad = util.get_mad_2d(data)
+    np.testing.assert_allclose(mad, [1.5e6, 1e6])
+
+    # Should match get_mad_1d for each column, including masked values
+    data = np.ma.masked_array(np.linspace(1, 2, 60).reshape(10, 6)**2)
+    data[3, 1] = np.ma.masked
+    data[:, 4] = np.ma.masked
+    mad = util.get_mad_2d(data)
+    for i in range(data.shape[1]):
+        if i == 4:
+            # All of the differences in this column are masked
+            assert mad.mask[i]
+        else:
+            np.testing.assert_allclose(mad[i], util.get_mad_1d(data[:, i]))
+
+
+def test_nearest_index(capsys):
+    # eureka.lib.util.nearest_index test
+    array = np.array([1., 2., 3., 4.])
+    assert util.nearest_index(array, 2.4) == 1
+    assert util.nearest_index(array, 0.) == 0
+    assert util.nearest_index(array, 10.) == 3
+    # Ties go to the lowest index
+    assert util.nearest_index(array, 2.5) == 1
+
+    # Decreasing arrays
+    array = array[::-1]
+    assert util.nearest_index(array, 2.4) == 2
+    assert util.nearest_index(array, 0.) == 3
+    assert util.nearest_index(array, 10.) == 0
+    assert util.nearest_index(array, 2.5) == 1
+
+    # Repeated values give the first of them
+    assert util.nearest_index(np.array([1., 2., 2., 3.]), 2.1) == 1
+    assert util.nearest_index(np.array([3., 2., 2., 1.]), 2.1) == 1
+
+    # Should match np.argmin(np.abs(array-value)), including when the
+    # ends of the array are NaNs
+    arrays = [np.linspace(0.6, 5.3, 37), np.linspace(5.3, 0.6, 37),
+              np.array([np.nan, 1., 2., 3.]), np.array([1., 2., 3., np.nan])]
+    for array in arrays:
+        for value in np.linspace(0., 6., 61):
+            assert (util.nearest_index(array, value) ==
+                    np.argmin(np.abs(array-value)))
+
+
 def test_medstddev(capsys):
     # eureka.lib.util.medstddev.medstddev test
     a = np.array([1, 3, 4, 5, 6, 7, 7])